@@ -1,8 +1,110 @@
 # main.py — mkdocs-macros (relative links, no dup paths)
 from pathlib import Path
-import re
+import atexit, hashlib, inspect, json, os
+
+HEAD_CHARS = 4096  # titles live in the front-matter / first heading
+
+def _title_from(text):
+    """YAML `title:` inside the front-matter, else the first H1, else None."""
+    in_fm = False
+    for i, line in enumerate(text.lstrip("\ufeff").splitlines()):
+        s = line.strip()
+        if in_fm:
+            if s == "---":
+                in_fm = False
+            elif line.startswith("title:") and line[6:].strip():
+                return line[6:].strip()
+        elif i == 0 and s == "---":
+            in_fm = True
+        elif line.startswith("#") and line[1:2].isspace() and line[2:].strip():
+            return line[1:].strip()
+    return None
+
+def page_title(p: Path):
+    # Only read the head of the file; fall back to a full read if needed
+    with p.open("r", encoding="utf-8", errors="ignore") as f:
+        head = f.read(HEAD_CHARS)
+    truncated = len(head) == HEAD_CHARS
+    if truncated:
+        head = head[:head.rfind("\n") + 1]  # drop the partial last line
+    title = _title_from(head)
+    if title is None and truncated:
+        title = _title_from(p.read_text(encoding="utf-8", errors="ignore"))
+    return title or p.stem.replace("-", " ")
+
+# ---- On-disk title cache: {"version": v, "pages": {rel_path: [[mtime_ns, size], title]}} ----
+# Editing the title-parsing code invalidates every cached title
+_TITLE_CACHE_VERSION = hashlib.blake2b(
+    (inspect.getsource(_title_from) + inspect.getsource(page_title) + str(HEAD_CHARS)).encode("utf-8"),
+    digest_size=8,
+).hexdigest()
+_TITLE_CACHE = {}
+_TITLE_CACHE_PATH = None
+_TITLE_CACHE_DIRTY = False
+_TITLE_SEEN = set()   # pages looked up this process; only these are saved
+
+def _load_title_cache(path: Path):
+    global _TITLE_CACHE, _TITLE_CACHE_PATH
+    if _TITLE_CACHE_PATH == path:
+        return  # already loaded (e.g. rebuild under `mkdocs serve`)
+    if _TITLE_CACHE_PATH is None:
+        atexit.register(_save_title_cache)
+    _TITLE_CACHE_PATH = path
+    _TITLE_CACHE = {}
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if isinstance(data, dict) and data.get("version") == _TITLE_CACHE_VERSION:
+            pages = data.get("pages")
+            _TITLE_CACHE = pages if isinstance(pages, dict) else {}
+    except Exception:
+        pass
+
+def _save_title_cache():
+    global _TITLE_CACHE, _TITLE_CACHE_DIRTY
+    if _TITLE_CACHE_PATH is None or not _TITLE_SEEN:
+        return
+    if _TITLE_CACHE.keys() - _TITLE_SEEN:
+        # Drop renamed / deleted pages
+        _TITLE_CACHE = {k: v for k, v in _TITLE_CACHE.items() if k in _TITLE_SEEN}
+        _TITLE_CACHE_DIRTY = True
+    if not _TITLE_CACHE_DIRTY:
+        return
+    try:
+        _TITLE_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        data = {"version": _TITLE_CACHE_VERSION, "pages": _TITLE_CACHE}
+        _TITLE_CACHE_PATH.write_text(json.dumps(data, sort_keys=True), encoding="utf-8")
+        _TITLE_CACHE_DIRTY = False
+    except Exception:
+        pass
+
+def cached_page_title(p: Path, rel: str, st=None):
+    """page_title(p), skipping the read when (mtime, size) is unchanged."""
+    global _TITLE_CACHE_DIRTY
+    st = st or p.stat()
+    key = [st.st_mtime_ns, st.st_size]
+    _TITLE_SEEN.add(rel)
+    hit = _TITLE_CACHE.get(rel)
+    if hit and hit[0] == key:
+        return hit[1]
+    title = page_title(p)
+    _TITLE_CACHE[rel] = [key, title]
+    _TITLE_CACHE_DIRTY = True
+    return title
+
+def _scan_md(folder, exclude, recursive):
+    # os.scandir entries carry their stat, so no extra syscall per file
+    with os.scandir(folder) as it:
+        for e in it:
+            if e.is_dir(follow_symlinks=False):
+                if recursive:
+                    yield from _scan_md(e.path, exclude, recursive)
+            elif e.name.endswith(".md") and e.name not in exclude and e.is_file():
+                yield e
 
 def define_env(env):
+    docs_dir = Path(env.conf["docs_dir"])
+    _load_title_cache(docs_dir.parent / ".cache" / "children_titles.json")
+
     @env.macro
     def children(exclude=('index.md',), recursive=False):
         page = env.variables["page"]
@@ -14,19 +116,13 @@ def define_env(env):
         folder_abs = docs_dir / folder_rel
 
         # Collect .md files
-        md_paths = folder_abs.rglob("*.md") if recursive else folder_abs.glob("*.md")
-        md_paths = [p for p in md_paths if p.name not in exclude and (recursive or p.parent == folder_abs)]
+        entries = list(_scan_md(folder_abs, exclude, recursive))
 
         items = []
-        for p in md_paths:
+        for e in entries:
+            p = Path(e.path)
             # Prefer YAML title -> first H1 -> filename
-            text = p.read_text(encoding="utf-8", errors="ignore")
-            m = re.search(r'(?m)^title:\s*(.+)$', text)
-            if m:
-                title = m.group(1).strip()
-            else:
-                h1 = re.search(r'(?m)^#\s+(.+)$', text)
-                title = h1.group(1).strip() if h1 else p.stem.replace("-", " ")
+            title = cached_page_title(p, p.relative_to(docs_dir).as_posix(), e.stat())
 
             # Build a link RELATIVE TO THE CURRENT FOLDER (critical!)
             rel_to_folder = p.relative_to(folder_abs).as_posix()  # e.g. "PS001.md" or "sub/PS010.md"
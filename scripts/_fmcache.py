@@ -0,0 +1,178 @@
+"""
+_fmcache.py
+-----------
+Front-matter + printer_meta for every component page, shared by
+generate_id_registry.py and build_labels.py.
+
+Parsed results are kept in .cache/fm_cache.json keyed by page path and
+(mtime_ns, size), so a page is read and YAML-parsed once until it changes,
+whichever script gets to it first. The whole cache is dropped when this
+module or the YAML loader changes.
+"""
+
+from pathlib import Path
+import os, re, json, hashlib
+import yaml
+try:
+    from yaml import CSafeLoader as _YAMLLoader   # libyaml, much faster
+except ImportError:
+    from yaml import SafeLoader as _YAMLLoader
+
+ROOT = Path(__file__).resolve().parents[1]
+CACHE_PATH = ROOT / ".cache" / "fm_cache.json"   # {"version": v, "pages": {rel: [[mtime_ns, size], fm, meta]}}
+# Parsing code + loader: editing either invalidates every cached page
+CACHE_VERSION = "%s/%s" % (
+    hashlib.blake2b(Path(__file__).read_bytes(), digest_size=8).hexdigest(),
+    _YAMLLoader.__name__,
+)
+
+# --------- Optional metadata block --------
+PRINTER_META_RE = re.compile(
+    r"<!--\s*printer_meta:(.*?)-->\s*<!--\s*/printer_meta\s*-->",
+    re.S | re.ASCII
+)
+
+def _split_front_matter(text: str):
+    """(yaml_text, body) for text opening with a `---` line, else None.
+
+    The closing delimiter is the first later line that strips to `---`
+    (indentation and trailing whitespace allowed). Candidates are found with
+    str.find instead of splitting the whole file into lines; the body is
+    sliced, never re-joined.
+    """
+    nl = text.find("\n")
+    if nl < 0 or text[:nl].strip() != "---":
+        return None
+    pos = nl + 1
+    while True:
+        i = text.find("---", pos)
+        if i < 0:
+            return None
+        start = text.rfind("\n", 0, i) + 1
+        eol = text.find("\n", i)
+        if eol < 0:
+            eol = len(text)
+        if not text[start:i].strip() and not text[i + 3:eol].strip():
+            return text[nl + 1:start], text[eol + 1:]
+        pos = eol + 1
+
+def parse_front_matter(text: str):
+    """Parse YAML front-matter strictly at the start of the file.
+
+    Supports optional UTF-8 BOM and CRLF line endings.
+    Returns (front_matter_dict, body_text). If no front-matter is found,
+    returns ({}, original_text).
+    """
+    if text.startswith("\ufeff"):
+        text_wo_bom = text[1:]
+        had_bom = True
+    else:
+        text_wo_bom = text
+        had_bom = False
+
+    # Opening line is `---` plus optional trailing whitespace (checked in
+    # _split_front_matter), as generate_id_registry has always accepted
+    if not text_wo_bom.startswith("---"):
+        return {}, text
+
+    split = _split_front_matter(text_wo_bom)
+    if split is None:
+        return {}, text
+    yml_text, body = split
+
+    try:
+        fm = yaml.load(yml_text, Loader=_YAMLLoader) or {}
+        if not isinstance(fm, dict):
+            fm = {}
+    except Exception:
+        fm = {}
+
+    if had_bom:
+        body = "\ufeff" + body
+
+    return fm, body
+
+def parse_printer_meta(text: str):
+    if "printer_meta:" not in text:
+        return {}  # most pages have none: skip the regex scan
+    m = PRINTER_META_RE.search(text)
+    if not m:
+        return {}
+    raw = m.group(1)
+    try:
+        return yaml.load(raw, Loader=_YAMLLoader) or {}
+    except Exception:
+        return {}
+
+def scan_md(folder):
+    """Every .md file under folder, as os.DirEntry (no stat per entry)."""
+    with os.scandir(folder) as it:
+        for e in it:
+            if e.is_dir(follow_symlinks=False):
+                yield from scan_md(e.path)
+            elif e.name.endswith(".md") and e.is_file():
+                yield e
+
+def _load_cache():
+    try:
+        data = json.loads(CACHE_PATH.read_text(encoding="utf-8"))
+        if isinstance(data, dict) and data.get("version") == CACHE_VERSION:
+            pages = data.get("pages")
+            return pages if isinstance(pages, dict) else {}
+    except Exception:
+        pass
+    return {}
+
+def _save_cache(cache):
+    try:
+        CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        data = {"version": CACHE_VERSION, "pages": cache}
+        CACHE_PATH.write_text(json.dumps(data, sort_keys=True), encoding="utf-8")
+    except Exception:
+        pass
+
+def iter_components(folder: Path, on_error=None):
+    """[(md_path, front_matter, printer_meta)] for every page under folder,
+    sorted by path.
+
+    A page that can't be read raises, or is skipped after on_error(md, exc)
+    when a callback is given.
+    """
+    cache = _load_cache()
+    fresh = {}
+    dirty = False
+    out = []
+    for e in sorted(scan_md(folder), key=lambda e: Path(e.path)):
+        md = Path(e.path)
+        rel = md.relative_to(ROOT).as_posix()
+        try:
+            st = e.stat()
+            key = [st.st_mtime_ns, st.st_size]
+            hit = cache.get(rel)
+            if hit and hit[0] == key:
+                fm, meta = hit[1], hit[2]
+            else:
+                text = md.read_text(encoding="utf-8")
+                fm, body = parse_front_matter(text)
+                meta = parse_printer_meta(body)   # the block lives in the body
+                entry = [key, fm, meta]
+                try:
+                    # Only cache what survives JSON unchanged (no dates etc.)
+                    if json.loads(json.dumps(entry)) == entry:
+                        dirty = True
+                    else:
+                        entry = None
+                except (TypeError, ValueError):
+                    entry = None
+                hit = entry
+        except Exception as exc:
+            if on_error is None:
+                raise
+            on_error(md, exc)
+            continue
+        if hit is not None:
+            fresh[rel] = hit
+        out.append((md, fm, meta))
+    if dirty or fresh.keys() != cache.keys():
+        _save_cache(fresh)   # also drops deleted pages
+    return out
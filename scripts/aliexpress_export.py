@@ -1,6 +1,10 @@
-import asyncio, json, re, sys
+import asyncio, contextlib, hashlib, json, re, sys
 from pathlib import Path
 from markdownify import markdownify as md
+try:
+    from lxml import html as lxml_html
+except ImportError:  # optional: markdownify is used on its own without it
+    lxml_html = None
 from playwright.async_api import async_playwright
 
 DESKTOP_SELECTORS = [
@@ -17,12 +21,30 @@ DESC_TAB_SELECTORS = [
 
 DIVIDER_MD = "\n\n---\n\n"
 
+# Compiled once; these run over every description candidate
+ITEM_RE      = re.compile(r"/item/([^/.]+)")
+NOISE_RE     = re.compile(r"<script[\s\S]*?</script>|<style[\s\S]*?</style>", re.I)
+BR_RE        = re.compile(r"(<br\s*/?>\s*){3,}", re.I)
+RUNPARAMS_RE = re.compile(r"runParams\s*=\s*(\{.*?\});", re.S)
+WWW_RE       = re.compile(r"^https?://www\.")
+DIGIT_RE     = re.compile(r"\d")
+SPACE_RE     = re.compile(r"\s+")
+BLANKS_RE    = re.compile(r"\n{3,}")
+MD_CHARS_RE  = re.compile(r"([\\`*_\[\]])")
+MD_LEAD_RE   = re.compile(r"^(\s*)(?=#|[-+](?:\s|$))|^(\s*\d+)(?=\.(?:\s|$))")
+MD_ITEM_RE   = re.compile(r"( *)(?:- |\d+\. )")
+
+USER_AGENT = ("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+MOBILE_USER_AGENT = ("Mozilla/5.0 (Linux; Android 13; Pixel 7) AppleWebKit/537.36 "
+                     "(KHTML, like Gecko) Chrome/120.0.0.0 Mobile Safari/537.36")
+
 def normalize_and_extract_id(u: str) -> tuple[str, str | None]:
     """
     Returns (normalized_url, product_id or None).
     Normalizes accidental typos in /item/<id> and forces .html.
     """
-    m = re.search(r"/item/([^/.]+)", u)
+    m = ITEM_RE.search(u)
     pid = None
     if m:
         raw = m.group(1)
@@ -64,9 +86,8 @@ def deep_get(d, *path):
 
 def norm_html(h: str) -> str:
     if not h: return ""
-    h = re.sub(r"<script[\s\S]*?</script>", "", h, flags=re.I)
-    h = re.sub(r"<style[\s\S]*?</style>", "", h, flags=re.I)
-    h = re.sub(r"(?i)(<br\s*/?>\s*){3,}", "<br><br>", h)
+    h = NOISE_RE.sub("", h)   # scripts and styles in one pass
+    h = BR_RE.sub("<br><br>", h)
     return h.strip()
 
 async def extract_descriptions_from_selectors(page, selectors):
@@ -82,6 +103,23 @@ async def extract_descriptions_from_selectors(page, selectors):
             pass
     return out
 
+# Per-call cap on parallel description fetches (stay polite to the CDN)
+MAX_PARALLEL_FETCHES = 4
+
+async def fetch_html_many(request, urls):
+    """GET the description URLs concurrently; failures and tiny bodies are skipped."""
+    sem = asyncio.Semaphore(MAX_PARALLEL_FETCHES)
+
+    async def _get(u):
+        async with sem:
+            resp = await request.get(u, timeout=60_000)
+            return await resp.text() if resp.ok else None
+
+    # dict.fromkeys: drop duplicate URLs, keep order
+    responses = await asyncio.gather(*(_get(u) for u in dict.fromkeys(urls)), return_exceptions=True)
+    return [norm_html(html) for html in responses
+            if isinstance(html, str) and len(html.strip()) > 30]
+
 async def fetch_iframe_desc(ctx, page):
     results = []
     try:
@@ -93,147 +131,408 @@ async def fetch_iframe_desc(ctx, page):
             if not src: continue
             if any(h in src for h in ("desc.alicdn.com", "aeproducts.", "ae01.alicdn.com")):
                 candidates.append(src)
-        for src in candidates:
-            try:
-                resp = await ctx.request.get(src, timeout=60_000)
-                if resp.ok:
-                    html = await resp.text()
-                    if html and len(html.strip()) > 30:
-                        results.append(norm_html(html))
-            except:
-                continue
+        results = await fetch_html_many(ctx.request, candidates)
     except:
         pass
     return results
 
-async def extract_all_descriptions(ctx, page, mobile=False):
+async def descriptions_from_runparams(request, rp):
+    """Description HTML embedded in, or linked from, a runParams-style dict."""
     results = []
-    # let dynamic bits settle
-    for _ in range(3):
-        try:
-            await page.wait_for_load_state("networkidle", timeout=3000)
+    # raw html
+    for kp in [
+        ("description",), ("data","description"), ("pageModule","description"),
+        ("data","desc"), ("pageModule","desc"),
+    ]:
+        val = deep_get(rp, *kp)
+        if isinstance(val, str) and len(val) > 30:
+            results.append(norm_html(val))
+    # descUrl
+    desc_urls = []
+    for kp in [
+        ("descUrl",), ("data","descUrl"), ("pageModule","descUrl"), ("actionModule","descUrl")
+    ]:
+        val = deep_get(rp, *kp)
+        if isinstance(val, str) and val.startswith("http"):
+            desc_urls.append(val)
+    results += await fetch_html_many(request, desc_urls)
+    return results
+
+# Stop probing once we have this much description
+ENOUGH_PARTS = 2
+ENOUGH_CHARS = 2000
+
+def _fp(h: str) -> bytes:
+    return hashlib.blake2b(h.encode("utf-8", "ignore"), digest_size=16).digest()
+
+def _dedupe(parts):
+    seen, uniq = set(), []
+    for h in parts:
+        if not h:
+            continue
+        k = _fp(h)
+        if k not in seen:
+            seen.add(k)
+            uniq.append(h)
+    return uniq
+
+def _is_enough(parts) -> bool:
+    return len(parts) >= ENOUGH_PARTS and sum(len(h) for h in parts) > ENOUGH_CHARS
+
+async def wait_settled(page, selectors, timeout=5000):
+    """Wait for networkidle or for a description container, whichever comes first.
+
+    Long-polling pages never go idle, so a visible candidate is good enough;
+    after `timeout` we carry on regardless.
+    """
+    waits = [
+        asyncio.ensure_future(page.wait_for_load_state("networkidle", timeout=timeout)),
+        asyncio.ensure_future(page.wait_for_selector(",".join(selectors), timeout=timeout)),
+    ]
+    pending = set(waits)
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        if any(not t.exception() for t in done):
             break
-        except:
-            pass
+    for t in pending:
+        t.cancel()
+    await asyncio.gather(*waits, return_exceptions=True)
 
+async def extract_all_descriptions(ctx, page, mobile=False):
+    results = []
     selectors = MOBILE_SELECTORS if mobile else DESKTOP_SELECTORS
+    # let dynamic bits settle
+    await wait_settled(page, selectors)
+
     results += await extract_descriptions_from_selectors(page, selectors)
+    if _is_enough(uniq := _dedupe(results)):
+        return uniq
 
     await click_description_tab(page)
     results += await extract_descriptions_from_selectors(page, selectors)
+    if _is_enough(uniq := _dedupe(results)):
+        return uniq
 
     rp = await pull_runparams(page)
     if rp:
-        # raw html
-        for kp in [
-            ("description",), ("data","description"), ("pageModule","description"),
-            ("data","desc"), ("pageModule","desc"),
-        ]:
-            val = deep_get(rp, *kp)
-            if isinstance(val, str) and len(val) > 30:
-                results.append(norm_html(val))
-        # descUrl
-        for kp in [
-            ("descUrl",), ("data","descUrl"), ("pageModule","descUrl"), ("actionModule","descUrl")
-        ]:
-            val = deep_get(rp, *kp)
-            if isinstance(val, str) and val.startswith("http"):
-                try:
-                    resp = await ctx.request.get(val, timeout=60_000)
-                    if resp.ok:
-                        html = await resp.text()
-                        if html and len(html.strip()) > 30:
-                            results.append(norm_html(html))
-                except:
-                    pass
+        results += await descriptions_from_runparams(ctx.request, rp)
+        if _is_enough(uniq := _dedupe(results)):
+            return uniq
 
     results += await fetch_iframe_desc(ctx, page)
+    return _dedupe(results)
 
-    # Deduplicate
-    def fp(s: str) -> str:
-        t = re.sub(r"\s+", " ", re.sub(r"<[^>]+>", " ", s)).strip().lower()
-        return t[:4000]
-    seen, uniq = set(), []
-    for h in results:
-        f = fp(h)
-        if f and f not in seen:
-            seen.add(f)
-            uniq.append(h)
-    return uniq
+# ---- Minimal lxml HTML -> Markdown for the tags AliExpress descriptions use ----
+BLOCK_TAGS = {"p", "div", "section", "article", "center", "blockquote"}
+
+def _inline(el) -> str:
+    """Markdown of an element's content, flattened to one line."""
+    out = []
+    _children_md(el, out)
+    return SPACE_RE.sub(" ", "".join(out)).strip()
+
+def _text(s: str) -> str:
+    """Collapsed text node with Markdown syntax escaped (as markdownify does
+    for * and _, plus anything that would start a heading or list)."""
+    s = MD_CHARS_RE.sub(r"\\\1", SPACE_RE.sub(" ", s))
+    return MD_LEAD_RE.sub(lambda m: (m.group(1) if m.group(1) is not None else m.group(2)) + "\\", s, count=1)
+
+def _children_md(el, out):
+    if el.text:
+        out.append(_text(el.text))
+    for child in el:
+        _to_md(child, out)
+
+def _to_md(el, out):
+    tag = el.tag.lower() if isinstance(el.tag, str) else ""  # comments: callable tag
+    if tag in ("script", "style") or not tag:
+        pass
+    elif tag == "br":
+        out.append("  \n")
+    elif tag == "img":
+        src = el.get("src") or el.get("data-src") or ""
+        if src:
+            out.append(f"![{el.get('alt') or ''}]({src})")
+    elif tag in ("strong", "b", "em", "i"):
+        mark = "**" if tag in ("strong", "b") else "*"
+        text = _inline(el)
+        if text:
+            out.append(f"{mark}{text}{mark}")
+    elif tag == "a":
+        text, href = _inline(el), el.get("href")
+        out.append(f"[{text}]({href})" if href and text else text)
+    elif len(tag) == 2 and tag[0] == "h" and tag[1] in "123456":
+        out.append(f"\n\n{'#' * int(tag[1])} {_inline(el)}\n\n")
+    elif tag in ("ul", "ol"):
+        out.append("\n\n" + "\n".join(_list_md(el)) + "\n\n")
+    elif tag == "table":
+        rows = []
+        for tr in el.iter("tr"):
+            cells = [_inline(td).replace("|", "\\|") for td in tr if isinstance(td.tag, str) and td.tag.lower() in ("td", "th")]
+            if cells:
+                rows.append(cells)
+        if rows:
+            width = max(len(r) for r in rows)
+            rows = [r + [""] * (width - len(r)) for r in rows]
+            lines = ["| " + " | ".join(rows[0]) + " |", "|" + "---|" * width]
+            lines += ["| " + " | ".join(r) + " |" for r in rows[1:]]
+            out.append("\n\n" + "\n".join(lines) + "\n\n")
+    elif tag in BLOCK_TAGS:
+        out.append("\n\n")
+        _children_md(el, out)
+        out.append("\n\n")
+    else:
+        _children_md(el, out)
+    if el.tail:
+        out.append(_text(el.tail))
+
+def _list_md(el, indent=""):
+    """Lines of a ul/ol; nested lists go under their item, indented."""
+    lines = []
+    n = 0
+    for li in el:
+        if not (isinstance(li.tag, str) and li.tag.lower() == "li"):
+            continue
+        n += 1
+        marker = f"{n}. " if el.tag.lower() == "ol" else "- "
+        out, subs = [], []
+        if li.text:
+            out.append(_text(li.text))
+        for child in li:
+            if isinstance(child.tag, str) and child.tag.lower() in ("ul", "ol"):
+                subs.append(child)
+                if child.tail:
+                    out.append(_text(child.tail))
+            else:
+                _to_md(child, out)
+        lines.append(indent + marker + SPACE_RE.sub(" ", "".join(out)).strip())
+        for sub in subs:
+            lines += _list_md(sub, indent + " " * len(marker))
+    return lines
+
+def _lxml_to_md(html_text: str) -> str:
+    root = lxml_html.fragment_fromstring(html_text, create_parent="div")
+    out = []
+    _children_md(root, out)
+    lines = []
+    for line in "".join(out).splitlines():
+        stripped = line.strip()
+        # keep the two trailing spaces of a <br> hard break
+        if stripped and line.endswith("  "):
+            stripped += "  "
+        # and the indent of a nested list item
+        item = MD_ITEM_RE.match(line)
+        lines.append(item.group(1) + stripped if item else stripped)
+    text = BLANKS_RE.sub("\n\n", "\n".join(lines)).strip()
+    return text + "\n" if text else ""
 
 def html_to_md(html_text: str) -> str:
+    if lxml_html is not None:
+        try:
+            return _lxml_to_md(html_text)
+        except Exception:
+            pass  # fall back to markdownify
     try:
         return md(html_text, strip=['style','script'])
     except:
         return "_(conversion to markdown failed, keeping HTML only)_"
 
-async def fetch_once(url: str, outdir: str = "exports"):
-    url, pid = normalize_and_extract_id(url)
-    async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        ctx = await browser.new_context(
-            locale="en-US",
-            user_agent=("Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
-                        "(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"),
-        )
-        page = await ctx.new_page()
+async def try_static(request, url: str):
+    """Fetch the mobile item page over plain HTTP and read runParams from it.
+
+    Returns the description parts, or None when the page is JS-gated (no
+    parsable runParams), in which case the caller falls back to a browser.
+    """
+    _, pid = normalize_and_extract_id(url)
+    if not pid:
+        return None
+    try:
+        resp = await request.get(f"https://m.aliexpress.com/item/{pid}.html", timeout=15_000)
+        if not resp.ok:
+            return None
+        html = await resp.text()
+        m = RUNPARAMS_RE.search(html)
+        if not m:
+            return None
+        rp = json.loads(m.group(1))
+    except:
+        return None
+    if not isinstance(rp, dict):
+        return None
+    return await descriptions_from_runparams(request, rp)
+
+# Scroll to the bottom in one round-trip and resolve after the next frame,
+# which is enough to trigger the lazy-loaded description blocks
+SCROLL_JS = """() => new Promise(r => {
+    window.scrollTo(0, document.body.scrollHeight);
+    requestAnimationFrame(() => setTimeout(r, 300));
+})"""
+
+async def settle_and_scroll(page, selectors):
+    # Same race as extract_all_descriptions: don't sit out a 3 s networkidle
+    # timeout on long-polling pages before the scroll
+    await wait_settled(page, selectors, timeout=3000)
+    try:
+        await page.evaluate(SCROLL_JS)
+    except:
+        pass
+
+async def browser_parts(ctx, url: str):
+    url, _ = normalize_and_extract_id(url)
+    page = await ctx.new_page()
+    try:
         await page.goto(url, wait_until="domcontentloaded", timeout=120_000)
-        await page.wait_for_timeout(900)
-        for y in (300, 1200, 2400):
-            try:
-                await page.evaluate(f"window.scrollTo(0,{y});")
-                await page.wait_for_timeout(250)
-            except:
-                break
+        await settle_and_scroll(page, DESKTOP_SELECTORS)
 
         parts = await extract_all_descriptions(ctx, page, mobile=False)
+    finally:
+        await page.close()
 
-        # If we didn't get multiple chunks, try mobile too
-        if len(parts) < 2:
-            mobile_url = re.sub(r"^https?://www\.", "https://m.", url).split("?")[0]
-            if not mobile_url.endswith(".html"):
-                mobile_url += ".html"
+    # If we didn't get multiple chunks, try mobile too
+    if not _is_enough(parts):
+        mobile_url = WWW_RE.sub("https://m.", url).split("?")[0]
+        if not mobile_url.endswith(".html"):
+            mobile_url += ".html"
+        try:
+            mpage = await ctx.new_page()
             try:
-                mpage = await ctx.new_page()
                 await mpage.goto(mobile_url, wait_until="domcontentloaded", timeout=120_000)
-                await mpage.wait_for_timeout(600)
+                await settle_and_scroll(mpage, MOBILE_SELECTORS)
                 parts += await extract_all_descriptions(ctx, mpage, mobile=True)
-                await mpage.close()
-            except:
-                pass
-
-        # Final de-dupe across sources
-        seen, uniq = set(), []
-        for h in parts:
-            k = re.sub(r"\s+", " ", re.sub(r"<[^>]+>", " ", h)).strip().lower()
-            if k and k not in seen:
-                seen.add(k)
-                uniq.append(h)
-
-        if not pid:
-            # fallback: extract digits again from final URL
-            pid = "".join(re.findall(r"\d", url))[-16:] or "aliexpress-item"
-
-        full_md = ""
-        if uniq:
-            full_md = (DIVIDER_MD).join(html_to_md(h) for h in uniq)
-        else:
-            full_md = "_(No description section found)_"
+            finally:
+                await mpage.close()   # the context is pooled: don't leak pages
+        except:
+            pass
+    return parts
+
+def save_export(url: str, parts, outdir: str = "exports"):
+    url, pid = normalize_and_extract_id(url)
+
+    # Final de-dupe across sources
+    uniq = _dedupe(parts)
+
+    if not pid:
+        # fallback: extract digits again from final URL
+        pid = "".join(DIGIT_RE.findall(url))[-16:] or "aliexpress-item"
 
-        Path(outdir).mkdir(parents=True, exist_ok=True)
-        out_path = Path(outdir) / f"{pid}.md"
+    full_md = ""
+    if uniq:
+        full_md = (DIVIDER_MD).join(html_to_md(h) for h in uniq)
+    else:
+        full_md = "_(No description section found)_"
 
-        # Add a tiny header with source URL for traceability
-        header = f"> Source: {url}\n\n"
-        out_path.write_text(header + full_md, encoding="utf-8")
+    Path(outdir).mkdir(parents=True, exist_ok=True)
+    out_path = Path(outdir) / f"{pid}.md"
 
-        print(f"Saved: {out_path}")
+    # Add a tiny header with source URL for traceability
+    header = f"> Source: {url}\n\n"
+    out_path.write_text(header + full_md, encoding="utf-8")
 
+    print(f"Saved: {out_path}")
 
-        print("-" * 10)
 
-        print(full_md)
-        await browser.close()
+    print("-" * 10)
+
+    print(full_md)
+    return out_path
+
+class BrowserPool:
+    """One lazily launched headless Chromium handing out pooled contexts.
+
+    Contexts are returned to the pool after use (not closed), so several
+    exports share a single browser start-up. Call `close()` when done, or
+    use the pool as an `async with` block.
+    """
+
+    def __init__(self, pool_size: int = 5):
+        self.pool_size = max(1, pool_size)
+        self._pw = None
+        self._request = None
+        self._browser = None
+        self._queue = None
+        self._lock = asyncio.Lock()
+
+    async def _start_playwright(self):
+        if self._pw is None:
+            self._pw = await async_playwright().start()
+
+    async def request(self):
+        """Browserless HTTP client (no Chromium launch) for static fetches."""
+        async with self._lock:
+            await self._start_playwright()
+            if self._request is None:
+                self._request = await self._pw.request.new_context(user_agent=MOBILE_USER_AGENT)
+            return self._request
+
+    async def _start(self):
+        async with self._lock:
+            if self._browser is not None:
+                return
+            await self._start_playwright()
+            self._browser = await self._pw.chromium.launch(headless=True)
+            self._queue = asyncio.Queue()
+            for _ in range(self.pool_size):
+                ctx = await self._browser.new_context(locale="en-US", user_agent=USER_AGENT)
+                self._queue.put_nowait(ctx)
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        await self._start()
+        ctx = await self._queue.get()
+        try:
+            yield ctx
+        finally:
+            self._queue.put_nowait(ctx)
+
+    async def close(self):
+        if self._request is not None:
+            await self._request.dispose()
+        if self._browser is not None:
+            await self._browser.close()
+        if self._pw is not None:
+            await self._pw.stop()
+        self._pw = self._request = self._browser = self._queue = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+async def fetch_many(urls, outdir: str = "exports", max_concurrency: int = 5, pool: BrowserPool | None = None):
+    """Export several product pages, at most `max_concurrency` at a time.
+
+    Pass a `pool` to keep the browser warm across calls; otherwise a
+    temporary one is created and closed at the end.
+    """
+    own_pool = pool is None
+    if own_pool:
+        # No more contexts than pages: a single-URL run starts just one
+        pool = BrowserPool(pool_size=min(max_concurrency, len(urls)))
+    sem = asyncio.Semaphore(max_concurrency)
+
+    async def _one(url):
+        async with sem:
+            try:
+                # Static fast path first; only render in Chromium when it falls short
+                parts = await try_static(await pool.request(), url)
+                if parts is None or not _is_enough(parts):
+                    async with pool.acquire() as ctx:
+                        parts = (parts or []) + await browser_parts(ctx, url)
+                return save_export(url, parts, outdir)
+            except Exception as e:
+                print(f"[error] {url}: {e}", file=sys.stderr)
+                return None
+
+    try:
+        return await asyncio.gather(*[_one(url) for url in urls])
+    finally:
+        if own_pool:
+            await pool.close()
+
+async def fetch_once(url: str, outdir: str = "exports", pool: BrowserPool | None = None):
+    results = await fetch_many([url], outdir, max_concurrency=1, pool=pool)
+    return results[0]
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
@@ -241,5 +540,7 @@ if __name__ == "__main__":
         sys.exit(1)
     url = sys.argv[1]
     outdir = sys.argv[2] if len(sys.argv) > 2 else "exports"
-    asyncio.run(fetch_once(url, outdir))
+    results = asyncio.run(fetch_many([url], outdir))
+    if any(r is None for r in results):
+        sys.exit(1)   # _one already printed the error
 
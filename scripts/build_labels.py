@@ -1,10 +1,18 @@
 #!/usr/bin/env python3
 from pathlib import Path
-import re, csv, json
-import yaml
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import argparse, io, os, json, hashlib
+import PIL
 from PIL import Image, ImageDraw, ImageFont
 import qrcode
+try:
+    import segno   # optional: much faster encoder, same symbols
+except ImportError:
+    segno = None
 from urllib.parse import quote
+from importlib import metadata
+from _fmcache import iter_components   # shared front-matter/printer_meta cache
 
 # ----------------- Preset -----------------
 PRESET = "large"   # "compact" or "large"
@@ -18,10 +26,15 @@ FONTS_DIR = ROOT / "fonts"
 OUT.mkdir(parents=True, exist_ok=True)
 
 ASSIGNMENT_PATH = OUT / "assignment.json"   # persistent order of IDs
+RENDER_CACHE_PATH = OUT / ".render_cache.json"  # {id: hash of label inputs}
 
 # ----------- Printer/layout ---------------
 MAX_WIDTH = 384           # exact print width in dots for T02
 QR_BORDER = 1
+QR_MASK = None            # 0-7 fixes the mask pattern (skips scoring all 8); None = best mask
+OUTPUT_MODE = "1"         # saved labels/sheets are 1-bit: the T02 prints black or white
+PNG_COMPRESS_LEVEL = 1    # fast zlib; 1-bit PNGs are tiny either way
+PNG_OPTIMIZE = False      # --optimize: zlib 9 + optimize, smallest files, slower
 
 DPI = 203
 LABEL_HEIGHT_MM = 25
@@ -49,6 +62,14 @@ TOP_PADDING     = 2
 BOTTOM_PADDING  = 2
 MAX_INFO_LINES  = 5
 
+# Text is drawn at its final pixel size (FreeType anti-aliases it); >1
+# supersamples the text panel instead and downsizes it afterwards
+TEXT_SCALE      = 1
+# Downsizing filter for TEXT_SCALE > 1: BILINEAR is several times cheaper than
+# LANCZOS and indistinguishable once thresholded to 1-bit at 203 DPI, except
+# on Pillow-SIMD (".postN" versions) where LANCZOS is cheap too
+TEXT_RESAMPLE   = Image.LANCZOS if ".post" in PIL.__version__ else Image.BILINEAR
+
 # Per-preset sizing
 if PRESET == "large":
     TITLE_FONT_SIZE  = 20
@@ -56,14 +77,12 @@ if PRESET == "large":
     SMALL_FONT_SIZE  = 13
     LINE_SPACING     = 20
     TITLE_SPACING    = 24
-    TEXT_SCALE       = 3
 else:
     TITLE_FONT_SIZE  = 17
     LINE_FONT_SIZE   = 15
     SMALL_FONT_SIZE  = 12
     LINE_SPACING     = 18
     TITLE_SPACING    = 22
-    TEXT_SCALE       = 2
 
 
 # -------- Short QR mode (uniform sizes) --------
@@ -71,107 +90,118 @@ SHORT_QR_MODE = True   # if True, generate docs/components/qr/<ID>/index.html re
 QR_SHORT_PREFIX = "https://thibserot.github.io/electronics-catalog/qr/"
 QR_STUB_ROOT = DOCS / "qr"
 
-# --------- Optional metadata block --------
-PRINTER_META_RE = re.compile(
-    r"<!--\s*printer_meta:(.*?)-->\s*<!--\s*/printer_meta\s*-->",
-    re.S
-)
-
 # ---------------- Fonts -------------------
-def load_font(path: Path, size: int):
+@lru_cache(maxsize=64)
+def _load_font_cached(path_str: str, size: int):
     try:
-        return ImageFont.truetype(str(path), size)
+        return ImageFont.truetype(path_str, size)
     except Exception:
         return None
 
-FONT_BOLD   = load_font(FONTS_DIR / "DejaVuSans-Bold.ttf", TITLE_FONT_SIZE) or ImageFont.load_default()
-FONT_REG_16 = load_font(FONTS_DIR / "DejaVuSans.ttf",      LINE_FONT_SIZE)  or ImageFont.load_default()
-FONT_REG_13 = load_font(FONTS_DIR / "DejaVuSans.ttf",      SMALL_FONT_SIZE) or ImageFont.load_default()
+def load_font(path: Path, size: int):
+    # One FreeType face per (file, size) per process, shared by all labels
+    return _load_font_cached(str(path), size)
+
+# Per-process state set by _worker_init(): fallback fonts (font objects
+# don't pickle) and the previous run's render cache
+FONT_BOLD = FONT_REG_16 = FONT_REG_13 = None
+_PREV_RENDER_CACHE = {}
+
+def _worker_init(render_cache=None, optimize=False):
+    global FONT_BOLD, FONT_REG_16, FONT_REG_13, _PREV_RENDER_CACHE, PNG_OPTIMIZE
+    PNG_OPTIMIZE = optimize
+    _PREV_RENDER_CACHE = render_cache or {}
+    FONT_BOLD   = load_font(FONTS_DIR / "DejaVuSans-Bold.ttf", TITLE_FONT_SIZE) or ImageFont.load_default()
+    FONT_REG_16 = load_font(FONTS_DIR / "DejaVuSans.ttf",      LINE_FONT_SIZE)  or ImageFont.load_default()
+    FONT_REG_13 = load_font(FONTS_DIR / "DejaVuSans.ttf",      SMALL_FONT_SIZE) or ImageFont.load_default()
+    if TEXT_SCALE != 1:
+        # Warm the cache with the supersampled faces render_text_panel uses
+        load_font(FONTS_DIR / "DejaVuSans-Bold.ttf", TITLE_FONT_SIZE * TEXT_SCALE)
+        load_font(FONTS_DIR / "DejaVuSans.ttf",      LINE_FONT_SIZE  * TEXT_SCALE)
+        load_font(FONTS_DIR / "DejaVuSans.ttf",      SMALL_FONT_SIZE * TEXT_SCALE)
 
 # --------------- Helpers ------------------
-def parse_front_matter(text: str):
-    """Parse YAML front-matter strictly at the start of the file.
+class GlyphWidths(dict):
+    """Per-font advance widths, measured once per character on first use."""
 
-    Supports optional UTF-8 BOM and CRLF line endings.
-    Returns (front_matter_dict, body_text). If no front-matter is found,
-    returns ({}, original_text).
-    """
-    if text.startswith("\ufeff"):
-        text_wo_bom = text[1:]
-        had_bom = True
-    else:
-        text_wo_bom = text
-        had_bom = False
-
-    if not (text_wo_bom.startswith("---\n") or text_wo_bom.startswith("---\r\n")):
-        return {}, text
-
-    lines = text_wo_bom.splitlines(keepends=True)
-    if not lines or lines[0].strip() != "---":
-        return {}, text
-
-    yml_lines = []
-    i = 1
-    while i < len(lines):
-        if lines[i].strip() == "---":
-            i += 1
-            break
-        yml_lines.append(lines[i])
-        i += 1
-    else:
-        return {}, text
+    def __init__(self, font):
+        super().__init__()
+        self.font = font
 
-    yml_text = "".join(yml_lines)
-    body = "".join(lines[i:])
+    def __missing__(self, ch):
+        w = self[ch] = self.font.getlength(ch)
+        return w
 
-    try:
-        fm = yaml.safe_load(yml_text) or {}
-        if not isinstance(fm, dict):
-            fm = {}
-    except Exception:
-        fm = {}
+@lru_cache(maxsize=32)
+def _glyph_widths(font):
+    return GlyphWidths(font)
 
-    if had_bom:
-        body = "\ufeff" + body
+# Measuring only needs a font, not the target canvas
+_MEASURE_DRAW = ImageDraw.Draw(Image.new("L", (1, 1), 255))
 
-    return fm, body
+@lru_cache(maxsize=8192)
+def _measure(font, text):
+    # Shaped width, memoized per process: "Use:", "...", repeated words etc.
+    return _MEASURE_DRAW.textlength(text, font=font)
 
-def parse_printer_meta(text: str):
-    m = PRINTER_META_RE.search(text)
-    if not m:
-        return {}
-    raw = m.group(1)
-    try:
-        return yaml.safe_load(raw) or {}
-    except Exception:
-        return {}
+def wrap_to_width(text: str, font, max_w):
+    # Lines repeat across labels (shared names, "Use: ..." texts): memoize,
+    # handing out a fresh list since callers edit the result
+    return list(_wrap(text, font, max_w))
 
-def wrap_to_width(text: str, font, max_w, draw):
+@lru_cache(maxsize=2048)
+def _wrap(text, font, max_w):
     words = text.split()
     if not words:
-        return []
-    lines, cur = [], words[0]
+        return ()
+    lines = []
+    if getattr(font, "layout_engine", None) == ImageFont.Layout.RAQM:
+        # Shaped text (ligatures, complex scripts) is not a sum of glyphs:
+        # measure each candidate line whole
+        cur = words[0]
+        for w in words[1:]:
+            test = cur + " " + w
+            if _measure(font, test) <= max_w:
+                cur = test
+            else:
+                lines.append(cur)
+                cur = w
+        lines.append(cur)
+        return tuple(lines)
+    # Advances add up (ignoring kerning, a fraction of a pixel per pair):
+    # measure each word once and keep a running line width
+    widths = _glyph_widths(font)
+    space_w = widths[" "]
+    cur, cur_w = [words[0]], sum(widths[c] for c in words[0])
     for w in words[1:]:
-        test = cur + " " + w
-        if draw.textlength(test, font=font) <= max_w:
-            cur = test
+        ww = sum(widths[c] for c in w)
+        if cur_w + space_w + ww <= max_w:
+            cur.append(w)
+            cur_w += space_w + ww
         else:
-            lines.append(cur)
-            cur = w
-    lines.append(cur)
-    return lines
+            lines.append(" ".join(cur))
+            cur, cur_w = [w], ww
+    lines.append(" ".join(cur))
+    return tuple(lines)
 
-def render_text_panel(title, info_lines, code, height, width):
-    """Render text within EXACT height. Top-aligned, no overflow."""
+def render_text_panel(title, info_lines, code, height, width, into=None, at=(0, 0)):
+    """Render text within EXACT height. Top-aligned, no overflow.
+
+    At native scale, text is drawn straight onto `into` (an "L" image) with
+    its top-left at `at`, and `into` is returned; the caller keeps the area
+    outside the panel clear. Otherwise a separate panel image is returned.
+    """
     SCALE = TEXT_SCALE
     w_hi = width * SCALE
     h_hi = height * SCALE
-    img_hi = Image.new("L", (w_hi, h_hi), 255)
-    d = ImageDraw.Draw(img_hi)
 
-    font_title = load_font(FONTS_DIR / "DejaVuSans-Bold.ttf", TITLE_FONT_SIZE * SCALE) or FONT_BOLD
-    font_line  = load_font(FONTS_DIR / "DejaVuSans.ttf",      LINE_FONT_SIZE  * SCALE) or FONT_REG_16
-    font_small = load_font(FONTS_DIR / "DejaVuSans.ttf",      SMALL_FONT_SIZE * SCALE) or FONT_REG_13
+    if SCALE == 1:
+        # Native size: FreeType's own anti-aliasing, fonts already loaded
+        font_title, font_line, font_small = FONT_BOLD, FONT_REG_16, FONT_REG_13
+    else:
+        font_title = load_font(FONTS_DIR / "DejaVuSans-Bold.ttf", TITLE_FONT_SIZE * SCALE) or FONT_BOLD
+        font_line  = load_font(FONTS_DIR / "DejaVuSans.ttf",      LINE_FONT_SIZE  * SCALE) or FONT_REG_16
+        font_small = load_font(FONTS_DIR / "DejaVuSans.ttf",      SMALL_FONT_SIZE * SCALE) or FONT_REG_13
 
     def line_h(kind="line"):
         return {
@@ -181,24 +211,24 @@ def render_text_panel(title, info_lines, code, height, width):
         }[kind]
 
     def ellipsize(txt, font, max_w):
-        if d.textlength(txt, font=font) <= max_w:
+        if _measure(font, txt) <= max_w:
             return txt
         if len(txt) <= 1:
             return txt
         t = txt
-        while d.textlength(t + "...", font=font) > max_w and len(t) > 1:
+        while _measure(font, t + "...") > max_w and len(t) > 1:
             t = t[:-1]
         return t + "..."
 
     # Prepare wrapped lines
-    title_wrapped = wrap_to_width(title, font_title, w_hi, d) or [""]
+    title_wrapped = wrap_to_width(title, font_title, w_hi) or [""]
     title_wrapped = title_wrapped[:2]
     if title_wrapped:
         title_wrapped[-1] = ellipsize(title_wrapped[-1], font_title, w_hi)
 
     info_wrapped = []
     for ln in info_lines or []:
-        info_wrapped += wrap_to_width(ln, font_line, w_hi, d)
+        info_wrapped += wrap_to_width(ln, font_line, w_hi)
     info_wrapped = info_wrapped[:MAX_INFO_LINES]
 
     top_pad  = TOP_PADDING * SCALE
@@ -214,34 +244,84 @@ def render_text_panel(title, info_lines, code, height, width):
     info_wrapped = info_wrapped[:can_fit]
 
     # Draw
-    img_hi = Image.new("L", (w_hi, h_hi), 255)
+    if SCALE == 1 and into is not None:
+        img_hi, (x0, y0) = into, at
+    else:
+        img_hi, (x0, y0) = Image.new("L", (w_hi, h_hi), 255), (0, 0)
     d = ImageDraw.Draw(img_hi)
-    y = top_pad
+    y = y0 + top_pad
     for t in title_wrapped:
-        d.text((0, y), t, fill=0, font=font_title)
+        d.text((x0, y), t, fill=0, font=font_title)
         y += line_h("title")
     for ln in info_wrapped:
-        d.text((0, y), ln, fill=0, font=font_line)
+        d.text((x0, y), ln, fill=0, font=font_line)
         y += line_h("line")
 
-    code_y = h_hi - (SMALL_FONT_SIZE * SCALE) - (BOTTOM_PADDING * SCALE)
-    d.text((0, code_y), code, fill=0, font=font_small)
+    code_y = y0 + h_hi - (SMALL_FONT_SIZE * SCALE) - (BOTTOM_PADDING * SCALE)
+    d.text((x0, code_y), code, fill=0, font=font_small)
 
-    return img_hi.resize((width, height), Image.LANCZOS)
+    if SCALE == 1:
+        return img_hi
+    return img_hi.resize((width, height), TEXT_RESAMPLE, reducing_gap=2.0)
 
+# Memoized per process: callers only paste from the result, so the same
+# Image can be handed out again
+@lru_cache(maxsize=None)
 def compute_qr_for_height(data: str, target_h: int, border: int):
-    # Probe for module count
-    probe = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L, border=border, box_size=1)
-    probe.add_data(data)
-    probe.make(fit=True)
-    modules = probe.modules_count + 2 * border
+    # Encode once with the encoder picking its own (smallest fitting) version;
+    # segno and qrcode segment data differently, so a version chosen by one
+    # may be too small for the other
+    matrix = _qr_matrix(data, border)
+    modules = len(matrix)
     # Choose integer box size so total height <= target_h
     box = max(3, min(10, target_h // modules))  # clamp for readability
-    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L, border=border, box_size=box)
+    return _qr_image(matrix, box)
+
+# Matrix rows are 0/1 (bools or bytearrays); map dark 1 -> black 0 in C
+_QR_PIXELS = bytes.maketrans(b"\x00\x01", b"\xff\x00")
+
+def _qr_matrix(data: str, border: int):
+    """Module rows (truthy = dark), quiet zone included."""
+    if segno is not None:
+        qr = segno.make_qr(data, error="l", mask=QR_MASK, boost_error=False)
+        return list(qr.matrix_iter(border=border))
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L, border=border,
+                       mask_pattern=QR_MASK)
     qr.add_data(data)
     qr.make(fit=True)
-    img = qr.make_image(fill_color="black", back_color="white").convert("L")
-    return img
+    return qr.get_matrix()
+
+def _qr_image(matrix, box_size: int):
+    # 1-bit straight from the module matrix (one byte per module, dark -> 0),
+    # scaled up by box_size; no per-module rectangle drawing
+    n = len(matrix)
+    raw = b"".join(map(bytes, matrix)).translate(_QR_PIXELS)
+    img = Image.frombytes("1", (n, n), raw, "raw", "1;8")
+    return img.resize((n * box_size, n * box_size), Image.NEAREST)
+
+def write_if_changed(path: Path, data: bytes) -> bool:
+    """Write data unless path already holds exactly it (no-op rebuilds stay
+    no-ops for git and file watchers). One write + rename: no partial files."""
+    try:
+        if path.stat().st_size == len(data) and path.read_bytes() == data:
+            return False
+    except FileNotFoundError:
+        path.parent.mkdir(parents=True, exist_ok=True)
+    # Per-process temp name: pages sharing an id race on the same target,
+    # and each os.replace must find its own file
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_bytes(data)
+    os.replace(tmp, path)
+    return True
+
+def save_png(img, out_path: Path):
+    # Encode in memory, then write only if the file differs
+    buf = io.BytesIO()
+    if PNG_OPTIMIZE:
+        img.save(buf, "PNG", compress_level=9, optimize=True)
+    else:
+        img.save(buf, "PNG", compress_level=PNG_COMPRESS_LEVEL, optimize=False)
+    write_if_changed(out_path, buf.getvalue())
 
 def make_label_png(title, lines, url, code, out_path):
     # Build QR sized to fit the fixed label height
@@ -251,9 +331,6 @@ def make_label_png(title, lines, url, code, out_path):
     fixed = PADDING_LEFT + qr_img.width + TEXT_LEFT_GAP + TEXT_RIGHT_PAD
     text_col_w = max(120, MAX_WIDTH - fixed)
 
-    # Text panel *exactly* same height as QR
-    text_panel = render_text_panel(title, lines, code, qr_img.height, text_col_w)
-
     # Compose exactly MAX_WIDTH x LABEL_HEIGHT_PX
     W = MAX_WIDTH
     H = LABEL_HEIGHT_PX
@@ -265,15 +342,25 @@ def make_label_png(title, lines, url, code, out_path):
 
     img.paste(qr_img, (PADDING_LEFT, qr_y))
     text_x = PADDING_LEFT + qr_img.width + TEXT_LEFT_GAP
-    img.paste(text_panel, (text_x, text_y))
 
-    img.save(out_path)
+    # Text panel *exactly* same height as QR, drawn in place when possible
+    text_panel = render_text_panel(title, lines, code, qr_img.height, text_col_w,
+                                   into=img, at=(text_x, text_y))
+    if text_panel is img:
+        # Clip overhang (an unbreakable word, descenders) to the panel box
+        img.paste(255, (PADDING_LEFT + qr_img.width, 0, text_x, H))
+        img.paste(255, (text_x + text_col_w, 0, W, H))
+        img.paste(255, (text_x, text_y + qr_img.height, W, H))
+    else:
+        img.paste(text_panel, (text_x, text_y))
+
+    # Compose in "L" (anti-aliased text), threshold once for the 1-bit printer
+    img = img.convert(OUTPUT_MODE, dither=Image.Dither.NONE)
+    save_png(img, out_path)
     return img
 
 
 def ensure_redirect_stub(comp_id: str, target_url: str):
-    d = QR_STUB_ROOT / comp_id
-    d.mkdir(parents=True, exist_ok=True)
     html = f"""<!doctype html>
 <html>
   <head>
@@ -285,7 +372,7 @@ def ensure_redirect_stub(comp_id: str, target_url: str):
     <p>Redirecting to <a href="{target_url}">{target_url}</a></p>
   </body>
 </html>"""
-    (d / "index.html").write_text(html, encoding="utf-8")
+    write_if_changed(QR_STUB_ROOT / comp_id / "index.html", html.encode("utf-8"))
 
 
 def load_assignment():
@@ -299,7 +386,38 @@ def load_assignment():
     return []
 
 def save_assignment(order):
-    ASSIGNMENT_PATH.write_text(json.dumps({"order": order}, indent=2), encoding="utf-8")
+    write_if_changed(ASSIGNMENT_PATH, json.dumps({"order": order}, indent=2).encode("utf-8"))
+
+def load_render_cache():
+    try:
+        data = json.loads(RENDER_CACHE_PATH.read_text(encoding="utf-8"))
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+def save_render_cache(cache):
+    write_if_changed(RENDER_CACHE_PATH, json.dumps(cache, indent=2, sort_keys=True).encode("utf-8"))
+
+def _render_version():
+    # Everything a label's pixels depend on besides its text: this file (all
+    # layout constants + rendering code), the fonts, Pillow and the QR encoder
+    h = hashlib.blake2b(Path(__file__).read_bytes(), digest_size=16)
+    for font in sorted(FONTS_DIR.glob("*.ttf")):
+        st = font.stat()
+        h.update(f"{font.name}:{st.st_size}:{st.st_mtime_ns}".encode("utf-8"))
+    h.update(f"Pillow {PIL.__version__} {TEXT_RESAMPLE}".encode("utf-8"))  # SIMD builds resample differently
+    enc = "segno" if segno is not None else "qrcode"
+    try:
+        h.update(f"{enc} {metadata.version(enc)}".encode("utf-8"))
+    except metadata.PackageNotFoundError:
+        h.update(enc.encode("utf-8"))
+    return h.hexdigest()
+
+RENDER_VERSION = _render_version()
+
+def label_hash(title, lines, url, code):
+    key = (title, tuple(lines), url, code, PNG_OPTIMIZE, RENDER_VERSION)
+    return hashlib.blake2b(repr(key).encode("utf-8"), digest_size=16).hexdigest()
 
 def build_order(comp_ids):
     prev = load_assignment()
@@ -309,45 +427,52 @@ def build_order(comp_ids):
     save_assignment(order)
     return order
 
-def pack_sheets_stable(id_to_img, order):
-    from PIL import Image
+def _open_label(path):
+    im = Image.open(path)
+    if im.mode == OUTPUT_MODE:
+        im.load()   # our own 1-bit PNG: decode once, no convert copy
+        return im
+    return im.convert(OUTPUT_MODE, dither=Image.Dither.NONE)
 
-    img_map = {cid: Image.open(path).convert("L") for cid, path in id_to_img.items()}
+def pack_sheets_stable(id_to_img, order):
+    # Freshly rendered labels arrive as images; only cached ones are read back
+    img_map = {cid: im if isinstance(im, Image.Image) else _open_label(im)
+               for cid, im in id_to_img.items()}
     seq = [cid for cid in order if cid in img_map]
 
     sheets_meta = []
     positions = []
 
+    # The gap between two labels (with its divider) is the same every time:
+    # render it once, then build each sheet as one join of raw label rows
+    gap = Image.new(OUTPUT_MODE, (MAX_WIDTH, LABEL_GAP_PX), 255)
+    if DRAW_H_DIVIDER and LABEL_GAP_PX:
+        y_mid = LABEL_GAP_PX // 2
+        y0 = max(0, min(LABEL_GAP_PX - 1, y_mid - H_DIV_THICK // 2))
+        y1 = max(0, min(LABEL_GAP_PX - 1, y0 + H_DIV_THICK - 1))
+        gap.paste(0, (0, y0, MAX_WIDTH, y1 + 1))  # solid band, filled in C
+    gap_bytes = gap.tobytes()
+
     sheet_index = 1
     i = 0
     while i < len(seq):
         chunk = seq[i:i+4]
         images = [img_map[cid] for cid in chunk]
         total_h = sum(im.height for im in images) + LABEL_GAP_PX * max(0, len(images) - 1)
-        sheet = Image.new("L", (MAX_WIDTH, total_h), 255)
-        d = ImageDraw.Draw(sheet)
-        y = 0
-        for pos, (cid, im) in enumerate(zip(chunk, images), start=1):
-            sheet.paste(im, (0, y))
-            y += im.height
-            if pos < len(images):
-                if DRAW_H_DIVIDER:
-                    y_mid = y + LABEL_GAP_PX // 2
-                    y0 = max(0, min(total_h - 1, y_mid - H_DIV_THICK // 2))
-                    y1 = max(0, min(total_h - 1, y0 + H_DIV_THICK - 1))
-                    d.rectangle([0, y0, MAX_WIDTH - 1, y1], fill=0)
-                y += LABEL_GAP_PX
+        # Labels are all MAX_WIDTH wide in OUTPUT_MODE, so rows line up
+        sheet = Image.frombytes(OUTPUT_MODE, (MAX_WIDTH, total_h),
+                                gap_bytes.join(im.tobytes() for im in images))
         if DRAW_SHEET_TOP_BOTTOM:
-            d.rectangle([0, 0, MAX_WIDTH - 1, 0], fill=0)
-            d.rectangle([0, total_h - 1, MAX_WIDTH - 1, total_h - 1], fill=0)
+            sheet.paste(0, (0, 0, MAX_WIDTH, 1))
+            sheet.paste(0, (0, total_h - 1, MAX_WIDTH, total_h))
         if DRAW_VERTICAL_CUT_LINE:
             x0 = max(0, min(MAX_WIDTH - 1, MAX_WIDTH - CUT_LINE_INSET))
             x1 = max(0, min(MAX_WIDTH - 1, x0 + CUT_LINE_WIDTH - 1))
-            d.rectangle([x0, 0, x1, total_h - 1], fill=0)
+            sheet.paste(0, (x0, 0, x1 + 1, total_h))
 
         out_name = f"sheet_{sheet_index:03d}.png"
         out_path = OUT / out_name
-        sheet.save(out_path)
+        save_png(sheet, out_path)
 
         sheets_meta.append({"sheet": out_name, "height_px": total_h, "labels": len(images)})
         for pos, cid in enumerate(chunk, start=1):
@@ -356,90 +481,145 @@ def pack_sheets_stable(id_to_img, order):
         sheet_index += 1
         i += len(chunk)
 
-    with open(OUT / "sheet_positions.csv", "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=["sheet","position","id"])
-        w.writeheader()
-        w.writerows(positions)
+    write_csv(OUT / "sheet_positions.csv", ["sheet","position","id"], positions)
 
     return sheets_meta
 
+# ----------------- CSV helpers -----------------
+
+def _csv_q(value) -> str:
+    # Quote only when needed, like csv.QUOTE_MINIMAL
+    v = str(value)
+    if any(c in v for c in ',"\r\n'):
+        return '"' + v.replace('"', '""') + '"'
+    return v
+
+def write_csv(path: Path, fieldnames, rows):
+    """Write rows in one go; same bytes as csv.DictWriter's default dialect."""
+    lines = [",".join(fieldnames)]
+    lines += [",".join(_csv_q(r[k]) for k in fieldnames) for r in rows]
+    write_if_changed(path, ("\r\n".join(lines) + "\r\n").encode("utf-8"))
+
 # ----------------- URL helpers -----------------
 
+DOCS_PREFIX = DOCS.as_posix() + "/"
+
+def _docs_rel(md: Path) -> str:
+    """/docs-relative path of a .md page without the suffix, e.g. "components/x/PS001"."""
+    p = md.as_posix()
+    if not p.startswith(DOCS_PREFIX):
+        return md.relative_to(DOCS).with_suffix('').as_posix()   # raises as before
+    return p[len(DOCS_PREFIX):-3]
+
 def build_page_url(md: Path) -> str:
     # Build URL path directly from /docs-relative path (prevents double "components/").
-    rel = md.relative_to(DOCS).with_suffix('')
+    rel = _docs_rel(md)
     if md.name.lower() == "index.md":
-        rel_url = f"{rel.parent.as_posix()}/"
+        rel_url = f"{rel.rpartition('/')[0] or '.'}/"
     else:
-        rel_url = f"{rel.as_posix()}/"
+        rel_url = f"{rel}/"
     return "https://thibserot.github.io/electronics-catalog/" + quote(rel_url, safe="/")
 
 def fallback_id_for(md: Path, fm: dict) -> str:
     fid = (fm.get("id") or "").strip() if isinstance(fm, dict) else ""
     if fid:
         return fid
-    rel = md.relative_to(DOCS).with_suffix('')
     if md.name.lower() == "index.md":
-        folder = rel.parent.name.strip() or "index"
-        unique = str(rel).replace("/", "_")
+        rel = _docs_rel(md)
+        folder = rel.rpartition("/")[0].rpartition("/")[2].strip() or "index"
+        unique = rel.replace("/", "_")
         return f"{folder}__{unique}"
     return md.stem
 
-def main():
+def _build_page(md: Path, fm: dict, meta: dict):
+    """Write one page's redirect stub and (re)render its label.
+
+    Returns None for pages without a label, else
+    (comp_id, label_hash, Image-or-cached-PNG-path, index.csv row).
+    """
+    if isinstance(fm, dict) and fm.get("no_label") is True:
+        return None
+
+    comp_id   = fallback_id_for(md, fm)
+    comp_name = (fm.get("name") or "").strip() if isinstance(fm, dict) else ""
+    short     = (fm.get("short") or "").strip() if isinstance(fm, dict) else ""
+    use       = (fm.get("use")   or "").strip() if isinstance(fm, dict) else ""
+
+    full_url = (meta.get("qr_url") if meta else None) or (fm.get("qr_url") if isinstance(fm, dict) else None) or build_page_url(md)
+    url = full_url
+    if SHORT_QR_MODE:
+        ensure_redirect_stub(comp_id, full_url)
+        url = QR_SHORT_PREFIX + comp_id + "/"
+    title = (meta.get("title") if meta else None) or comp_name or (md.stem if md.name.lower() != "index.md" else md.parent.name)
+
+    lines = (meta.get("lines") if meta else None)
+    if not lines:
+        lines = []
+        if short: lines.append(short)
+        if use:   lines.append(use)
+
+    out_png = OUT / f"{comp_id}.png"
+    h = label_hash(title, lines, url, comp_id)
+    if _PREV_RENDER_CACHE.get(comp_id) == h and out_png.exists():
+        label = out_png   # unchanged: keep the existing PNG
+    else:
+        label = make_label_png(title, lines, url, code=comp_id, out_path=out_png)
+
+    row = {
+        "id": comp_id,
+        "name": comp_name or (md.parent.name if md.name.lower()=="index.md" else md.stem),
+        "url": url,
+        "label_png": str(out_png.relative_to(DOCS))
+    }
+    return comp_id, h, label, row
+
+def main(jobs=None, optimize=False):
+    global PNG_OPTIMIZE
+    PNG_OPTIMIZE = optimize   # sheets are saved here, labels in the workers
     rows = []
-    id_to_path = {}
+    id_to_img = {}   # id -> rendered Image, or PNG path when cached
+    render_cache = load_render_cache()
 
-    all_md_files = sorted(COMPONENTS.rglob("*.md"))
+    pages = iter_components(COMPONENTS)   # [(md, front-matter, printer_meta)]
 
-    for md in all_md_files:
-        text = md.read_text(encoding="utf-8")
-        fm, _ = parse_front_matter(text)
-        meta = parse_printer_meta(text)
+    # Pages are independent and CPU-bound (QR + text raster): build in parallel
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    if jobs == 1 or len(pages) < 2:
+        _worker_init(render_cache, optimize)   # no pool to start up
+        results = [_build_page(*page) for page in pages]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_worker_init,
+                                 initargs=(render_cache, optimize)) as ex:
+            results = list(ex.map(_build_page, *zip(*pages), chunksize=4))
 
-        if isinstance(fm, dict) and fm.get("no_label") is True:
+    for res in results:
+        if res is None:
             continue
+        comp_id, h, label, row = res
+        render_cache[comp_id] = h
+        id_to_img[comp_id] = label
+        rows.append(row)
+    save_render_cache(render_cache)
+
+    write_csv(OUT / "index.csv", ["id","name","url","label_png"], rows)
 
-        comp_id   = fallback_id_for(md, fm)
-        comp_name = (fm.get("name") or "").strip() if isinstance(fm, dict) else ""
-        short     = (fm.get("short") or "").strip() if isinstance(fm, dict) else ""
-        use       = (fm.get("use")   or "").strip() if isinstance(fm, dict) else ""
-
-        full_url = (meta.get("qr_url") if meta else None) or (fm.get("qr_url") if isinstance(fm, dict) else None) or build_page_url(md)
-        url = full_url
-        if SHORT_QR_MODE:
-            ensure_redirect_stub(comp_id, full_url)
-            url = QR_SHORT_PREFIX + comp_id + "/"
-        title = (meta.get("title") if meta else None) or comp_name or (md.stem if md.name.lower() != "index.md" else md.parent.name)
-
-        lines = (meta.get("lines") if meta else None)
-        if not lines:
-            lines = []
-            if short: lines.append(short)
-            if use:   lines.append(use)
-
-        out_png = OUT / f"{comp_id}.png"
-        make_label_png(title, lines, url, code=comp_id, out_path=out_png)
-        id_to_path[comp_id] = out_png
-
-        rows.append({
-            "id": comp_id,
-            "name": comp_name or (md.parent.name if md.name.lower()=="index.md" else md.stem),
-            "url": url,
-            "label_png": str(out_png.relative_to(DOCS))
-        })
-
-    with open(OUT / "index.csv", "w", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=["id","name","url","label_png"])
-        w.writeheader()
-        w.writerows(rows)
-
-    order = build_order(sorted(id_to_path.keys()))
-    sheets_meta = pack_sheets_stable(id_to_path, order)
+    order = build_order(sorted(id_to_img.keys()))
+    sheets_meta = pack_sheets_stable(id_to_img, order)
     if sheets_meta:
-        with open(OUT / "sheets.csv", "w", newline="", encoding="utf-8") as f:
-            w = csv.DictWriter(f, fieldnames=["sheet","height_px","labels"])
-            w.writeheader()
-            w.writerows(sheets_meta)
+        write_csv(OUT / "sheets.csv", ["sheet","height_px","labels"], sheets_meta)
+
+def _positive_int(value):
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return n
 
 if __name__ == "__main__":
-    main()
+    ap = argparse.ArgumentParser(description="Render sticker labels and print sheets.")
+    ap.add_argument("-j", "--jobs", type=_positive_int, default=None,
+                    help="worker processes (default: one per CPU; 1 = serial)")
+    ap.add_argument("--optimize", action="store_true",
+                    help="write the smallest PNGs (zlib 9 + optimize) instead of the fastest")
+    args = ap.parse_args()
+    main(jobs=args.jobs, optimize=args.optimize)
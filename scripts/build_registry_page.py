@@ -12,6 +12,10 @@ Run this after generate_id_registry.py.
 
 from pathlib import Path
 import sys, yaml, datetime
+try:
+    from yaml import CSafeLoader as _YAMLLoader   # libyaml, much faster
+except ImportError:
+    from yaml import SafeLoader as _YAMLLoader
 
 ROOT = Path(__file__).resolve().parents[1]
 DOCS = ROOT / "docs"
@@ -31,7 +35,7 @@ def main():
         print(f"[error] Missing {SRC}. Run generate_id_registry.py first.", file=sys.stderr)
         sys.exit(1)
 
-    data = yaml.safe_load(SRC.read_text(encoding="utf-8")) or {}
+    data = yaml.load(SRC.read_text(encoding="utf-8"), Loader=_YAMLLoader) or {}
     categories = data.get("categories", {})
     families   = data.get("families", {})
     gen_at     = data.get("generated_at", "")
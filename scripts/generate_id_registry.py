@@ -1,7 +1,13 @@
 #!/usr/bin/env python3
 from pathlib import Path
-import re, yaml, datetime
+import os, re, yaml, datetime
+from itertools import zip_longest
 from urllib.parse import quote
+try:
+    from yaml import CSafeDumper as _YAMLDumper   # libyaml
+except ImportError:
+    from yaml import SafeDumper as _YAMLDumper
+from _fmcache import iter_components   # shared front-matter/printer_meta cache
 
 ROOT = Path(__file__).resolve().parents[1]
 DOCS = ROOT / "docs"
@@ -25,39 +31,37 @@ CATEGORY_TITLES = {
 
 ID_RE = re.compile(r"^([A-Z]{2,3})(\d{3})$")
 
-def parse_front_matter(text: str):
-    if text.startswith("\ufeff"):
-        text = text[1:]
-    if not text.startswith("---"):
-        return {}, text
-    lines = text.splitlines(keepends=True)
-    if not lines or lines[0].strip() != "---":
-        return {}, text
-    yml_lines = []
-    i = 1
-    while i < len(lines):
-        if lines[i].strip() == "---":
-            i += 1
-            break
-        yml_lines.append(lines[i])
-        i += 1
-    else:
-        return {}, text
-    body = "".join(lines[i:])
-    try:
-        fm = yaml.safe_load("".join(yml_lines)) or {}
-        if not isinstance(fm, dict):
-            fm = {}
-    except Exception:
-        fm = {}
-    return fm, body
+def _same_after_first_line(a: Path, b: Path) -> bool:
+    with a.open(encoding="utf-8") as fa, b.open(encoding="utf-8") as fb:
+        next(fa, None)
+        next(fb, None)
+        return all(x == y for x, y in zip_longest(fa, fb))
+
+def write_yaml_if_changed(path: Path, payload: dict) -> bool:
+    """Dump payload to path unless only its `generated_at` would change."""
+    # Stream the dump into a temp file instead of building one big string;
+    # generated_at is always the first key, so compare everything after it
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")   # unique per writer
+    with tmp.open("w", encoding="utf-8") as fh:
+        yaml.dump(payload, fh, Dumper=_YAMLDumper, sort_keys=False, allow_unicode=True)
+    if path.exists() and _same_after_first_line(path, tmp):
+        tmp.unlink()
+        return False
+    os.replace(tmp, path)
+    return True
+
+DOCS_PREFIX = DOCS.as_posix() + "/"
 
 def build_page_url(md: Path) -> str:
-    rel = md.relative_to(DOCS).with_suffix("")
+    p = md.as_posix()
+    if p.startswith(DOCS_PREFIX):
+        rel = p[len(DOCS_PREFIX):-3]   # plain string slice, no Path round trip
+    else:
+        rel = md.relative_to(DOCS).with_suffix("").as_posix()   # raises as before
     if md.name.lower() == "index.md":
-        rel_url = f"{rel.parent.as_posix()}/"
+        rel_url = f"{rel.rpartition('/')[0] or '.'}/"
     else:
-        rel_url = f"{rel.as_posix()}/"
+        rel_url = f"{rel}/"
     return "https://thibserot.github.io/electronics-catalog/" + quote(rel_url, safe="/")
 
 def fallback_id_for(md: Path, fm: dict) -> str:
@@ -76,34 +80,33 @@ def parse_id(comp_id: str):
     is_anchor = (num % 100 == 0)
     return cat, num, hund, is_anchor
 
-def next_number(used_nums):
-    for n in range(1, 1000):
-        if n not in used_nums:
-            return f"{n:03d}"
-    return None
+def used_mask(nums) -> int:
+    """Bitmap of used numbers: bit n set <=> n is taken."""
+    mask = 0
+    for n in nums:
+        mask |= 1 << n
+    return mask
+
+def _first_free(mask: int, lo: int, hi: int):
+    # Lowest clear bit in [lo, hi): isolate it with x & -x, no Python loop
+    free = ~mask & ((1 << hi) - (1 << lo))
+    return (free & -free).bit_length() - 1 if free else None
 
-def next_in_family(used_nums, hund):
+def next_number(used):
+    n = _first_free(used, 1, 1000)
+    return f"{n:03d}" if n is not None else None
+
+def next_in_family(used, hund):
     base = hund * 100
-    if base not in used_nums:
-        return f"{base:03d}"
-    for off in range(0, 100):
-        n = base + off
-        if n not in used_nums:
-            return f"{n:03d}"
-    return None
+    n = _first_free(used, base, base + 100)
+    return f"{n:03d}" if n is not None else None
 
 def main():
-    all_md = sorted(COMPONENTS.rglob("*.md"))
     items = []
     warnings = []
 
-    for md in all_md:
-        try:
-            text = md.read_text(encoding="utf-8")
-        except Exception as e:
-            warnings.append(f"read-error: {md}: {e}")
-            continue
-        fm, _ = parse_front_matter(text)
+    pages = iter_components(COMPONENTS, on_error=lambda md, e: warnings.append(f"read-error: {md}: {e}"))
+    for md, fm, _ in pages:
 
         comp_id = fallback_id_for(md, fm)
         cat, num, hund, is_anchor = parse_id(comp_id)
@@ -151,26 +154,22 @@ def main():
             "alias": anchor_name.get(fam_key),
             "members": []
         })
-        fam["members"].append(it["id"])
+        fam["members"].append((num, it["id"]))   # number already parsed
 
     # sort family members
-    def id_num(cid):
-        m = ID_RE.match(cid)
-        return int(m.group(2)) if m else 0
     for fam in families.values():
-        fam["members"] = sorted(fam["members"], key=id_num)
+        fam["members"] = [cid for _, cid in sorted(fam["members"])]
 
     # categories: build for ALL predefined categories
     categories = {}
     for cat_code, cat_title in CATEGORY_TITLES.items():
         nums = sorted(used_by_cat.get(cat_code, set()))
-        next_any = next_number(set(nums)) if nums else "001"
+        used = used_mask(nums)
+        next_any = next_number(used) if nums else "001"
         # next_by_family ONLY for families that exist (anchors present) under this cat
         next_by_family = {}
         # compute hundreds present that have anchors
         fams_in_cat = [fk for fk in anchors if fk.startswith(cat_code)]
-        # we still need used numbers for candidate computation
-        used = set(nums)
         for fk in sorted(fams_in_cat):
             # derive hundreds digit from fk (last two before 'xx')
             try:
@@ -199,7 +198,7 @@ def main():
         "warnings": warnings
     }
     full_path = OUT_DIR / "id_registry.yaml"
-    full_path.write_text(yaml.safe_dump(full_payload, sort_keys=False, allow_unicode=True), encoding="utf-8")
+    full_changed = write_yaml_if_changed(full_path, full_payload)
 
     simple_payload = {
         "generated_at": generated_at,
@@ -216,10 +215,10 @@ def main():
         } for k, v in families.items()},
     }
     simple_path = OUT_DIR / "id_registry_simple.yaml"
-    simple_path.write_text(yaml.safe_dump(simple_payload, sort_keys=False, allow_unicode=True), encoding="utf-8")
+    simple_changed = write_yaml_if_changed(simple_path, simple_payload)
 
-    print(f"[ok] Wrote {full_path.relative_to(Path.cwd())}")
-    print(f"[ok] Wrote {simple_path.relative_to(Path.cwd())}")
+    for path, changed in ((full_path, full_changed), (simple_path, simple_changed)):
+        print(f"[ok] {'Wrote' if changed else 'Unchanged'} {path.relative_to(Path.cwd())}")
 
 if __name__ == "__main__":
     main()